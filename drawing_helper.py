@@ -1,21 +1,27 @@
 import numpy as np
 import PyKDL as kdl
-from mpl_toolkits.mplot3d import Axes3D
+from typing import TYPE_CHECKING
 
 import general_utility as general
 
+if TYPE_CHECKING:
+  from mpl_toolkits.mplot3d import Axes3D
+
 
 class FrameDrawing(object):
   """Class to draw and hold information for a frame"""
   LENGTH = 200.0  # Length of the frame arms, change for frame size
-  X_UNIT = np.array([1, 0, 0
-                     ]) * LENGTH  # unit vector in X of length LENGTH for calcs
-  Y_UNIT = np.array([0, 1, 0
-                     ]) * LENGTH  # unit vector in Y of length LENGTH for calcs
-  Z_UNIT = np.array([0, 0, 1
-                     ]) * LENGTH  # unit vector in Z of length LENGTH for calcs
-
-  def __init__(self, ax: Axes3D, color=None):
+  X_UNIT = np.array(
+      [1, 0, 0], dtype=general.FLOAT_TYPE
+  ) * LENGTH  # unit vector in X of length LENGTH for calcs
+  Y_UNIT = np.array(
+      [0, 1, 0], dtype=general.FLOAT_TYPE
+  ) * LENGTH  # unit vector in Y of length LENGTH for calcs
+  Z_UNIT = np.array(
+      [0, 0, 1], dtype=general.FLOAT_TYPE
+  ) * LENGTH  # unit vector in Z of length LENGTH for calcs
+
+  def __init__(self, ax: 'Axes3D', color=None):
     """Initialize the fraem drawing, set a color if desired
 
     Args:
@@ -38,7 +44,7 @@ class FrameDrawing(object):
     self._y_pos = 0.0
     self._z_pos = 0.0
 
-    self._rotation = np.eye(3)
+    self._rotation = np.eye(3, dtype=general.FLOAT_TYPE)
 
   def update_location(self, x: float, y: float, z: float):
     """Update the internal location of the frame drawing
@@ -60,7 +66,7 @@ class FrameDrawing(object):
     Args:
         location_vector (np.ndarray): location of the frame as a (3,) np vector
     """
-    general.check_proper_numpy_format(location_vector, (3, ))
+    assert general.check_proper_numpy_format(location_vector, (3, ))
     self._pos_vect = location_vector
     self._x_pos = location_vector[0]
     self._y_pos = location_vector[1]
@@ -72,7 +78,7 @@ class FrameDrawing(object):
     Args:
         rotation_matrix (np.ndarray): (3,3) numpy rotation matrix 
     """
-    general.check_proper_numpy_format(rotation_matrix, (3, 3))
+    assert general.check_proper_numpy_format(rotation_matrix, (3, 3))
     self._rotation = rotation_matrix
 
     self._x_vect = rotation_matrix @ self.X_UNIT
@@ -94,7 +100,7 @@ class FrameDrawing(object):
     Args:
         transform_matrix (np.ndarray): (4,4) transformation matrix
     """
-    general.check_proper_numpy_format(transform_matrix, (4, 4))
+    assert general.check_proper_numpy_format(transform_matrix, (4, 4))
 
     self.update_location_vector(transform_matrix[:3, 3])
     self.update_rotation(transform_matrix[:3, :3])
@@ -107,6 +113,7 @@ class FrameDrawing(object):
         [self._y_pos, self._y_pos + self._x_vect[1]],
         [self._z_pos, self._z_pos + self._x_vect[2]],
         color="r" if self.color is None else self.color,
+        animated=True,
     )
 
     # Draw Y Axis
@@ -115,6 +122,7 @@ class FrameDrawing(object):
         [self._y_pos, self._y_pos + self._y_vect[1]],
         [self._z_pos, self._z_pos + self._y_vect[2]],
         color="g" if self.color is None else self.color,
+        animated=True,
     )
 
     # Draw Z Axis
@@ -123,6 +131,7 @@ class FrameDrawing(object):
         [self._y_pos, self._y_pos + self._z_vect[1]],
         [self._z_pos, self._z_pos + self._z_vect[2]],
         color="b" if self.color is None else self.color,
+        animated=True,
     )
 
   def _update_artist(self, artist, x_pos: float, y_pos: float, z_pos: float,
@@ -150,25 +159,17 @@ class FrameDrawing(object):
                         self._z_pos, self._z_vect)
 
   def redraw(self):
-    """Redraw the artists using temporary animations"""
+    """Redraw the animated artists onto the canvas for blitting"""
     self._update_drawing()
 
-    self._x_axis_artist.set_animated(True)
     self._ax.draw_artist(self._x_axis_artist)
-    self._x_axis_artist.set_animated(False)
-
-    self._y_axis_artist.set_animated(True)
     self._ax.draw_artist(self._y_axis_artist)
-    self._y_axis_artist.set_animated(False)
-
-    self._z_axis_artist.set_animated(True)
     self._ax.draw_artist(self._z_axis_artist)
-    self._z_axis_artist.set_animated(False)
 
 
 class LinkDrawing(object):
   """Objects holding the information to draw/redraw a link"""
-  def __init__(self, ax: Axes3D, color=None):
+  def __init__(self, ax: 'Axes3D', color=None):
     """Initialize the Link Drawing
 
     Args:
@@ -179,8 +180,8 @@ class LinkDrawing(object):
     self._color = color
     self._line_artist = None
 
-    self._frame_1 = np.eye(4)
-    self._frame_2 = np.eye(4)
+    self._frame_1 = np.eye(4, dtype=general.FLOAT_TYPE)
+    self._frame_2 = np.eye(4, dtype=general.FLOAT_TYPE)
     self._frame_1_kdl = general.np_frame_to_kdl(self._frame_1)
     self._frame_2_kdl = general.np_frame_to_kdl(self._frame_2)
 
@@ -191,8 +192,8 @@ class LinkDrawing(object):
         frame_1 (np.ndarray): (4,4) transformation for start point
         frame_2 (np.ndarray): (4,4) transformation for end point
     """
-    general.check_proper_numpy_format(frame_1, (4, 4))
-    general.check_proper_numpy_format(frame_2, (4, 4))
+    assert general.check_proper_numpy_format(frame_1, (4, 4))
+    assert general.check_proper_numpy_format(frame_2, (4, 4))
 
     self._frame_1 = frame_1
     self._frame_2 = frame_2
@@ -208,7 +209,8 @@ class LinkDrawing(object):
          self._frame_2_kdl.p.y()],
         [self._frame_1_kdl.p.z(),
          self._frame_2_kdl.p.z()],
-        color='b' if self._color is None else self._color)
+        color='b' if self._color is None else self._color,
+        animated=True)
 
   def _update_drawing(self):
     """Update the artist with the internal data"""
@@ -223,8 +225,6 @@ class LinkDrawing(object):
          self._frame_2_kdl.p.z()])
 
   def redraw(self):
-    """Redraw the existing artist """
+    """Redraw the existing animated artist onto the canvas for blitting"""
     self._update_drawing()
-    self._line_artist.set_animated(True)
     self._ax.draw_artist(self._line_artist)
-    self._line_artist.set_animated(False)
@@ -1,19 +1,17 @@
 import numpy as np
 import math
-import PyKDL as kdl
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
+import importlib.util
 from typing import Tuple, List
-from copy import deepcopy
 
 import general_utility as general
-from robot_components import Brush, Link, Joint
+from robot_components import Brush, Link, Joint, held_brush_indices
 
 
 def dh_tf(alpha: float, a: float, d: float, theta: float) -> np.ndarray:
   """Create a DH transform using alpha, a, d, and theta
 
-  TODO -- you will need to fill this function in! 
+  The trig terms are evaluated once with math (cheaper than numpy on scalars)
+  and the matrix is built in a single allocation.
 
   Args:
       alpha (float): alpha angle in radians
@@ -24,12 +22,195 @@ def dh_tf(alpha: float, a: float, d: float, theta: float) -> np.ndarray:
   Returns:
       np.ndarray: (4,4) numpy array of the transformation matrix
   """
-  return 
+  ct = math.cos(theta)
+  st = math.sin(theta)
+  ca = math.cos(alpha)
+  sa = math.sin(alpha)
+
+  return np.array([[ct, -st * ca, st * sa, a * ct],
+                   [st, ct * ca, -ct * sa, a * st],
+                   [0.0, sa, ca, d],
+                   [0.0, 0.0, 0.0, 1.0]],
+                  dtype=general.FLOAT_TYPE)
+
+
+def dh_constants(dh_params: np.ndarray) -> np.ndarray:
+  """Fold the fixed part of a DH table into the terms fk_chain needs
+
+  alpha, a and d never change once the robot is built, so their trig is 
+  evaluated once here instead of on every forward kinematics call. 
+
+  Args:
+      dh_params (np.ndarray): (n,4) rows of alpha, a, d, theta_offset
+
+  Returns:
+      np.ndarray: (n,4) rows of cos(alpha), sin(alpha), a, d
+  """
+  return np.stack((np.cos(dh_params[:, 0]), np.sin(dh_params[:, 0]),
+                   dh_params[:, 1], dh_params[:, 2]),
+                  axis=1)
+
+
+@general.njit(cache=True, fastmath=True)
+def fk_chain(constants: np.ndarray, theta: np.ndarray,
+             dh_transforms: np.ndarray, cumulative: np.ndarray) -> None:
+  """Compiled forward kinematics over a whole DH table
+
+  Writes the DH transform of every joint into dh_transforms and folds them 
+  into cumulative, where cumulative[0] is the starting frame and 
+  cumulative[i + 1] is the transform from frame 0 to frame i + 1. Only the 
+  trig of theta is evaluated, the rest comes precomputed from dh_constants.
+
+  Args:
+      constants (np.ndarray): (n,4) rows of cos(alpha), sin(alpha), a, d
+      theta (np.ndarray): (n,) theta of each joint, offsets included
+      dh_transforms (np.ndarray): (n,4,4) output DH transforms
+      cumulative (np.ndarray): (n+1,4,4) output cumulative transforms
+  """
+  for i in range(constants.shape[0]):
+    ca = constants[i, 0]
+    sa = constants[i, 1]
+    a = constants[i, 2]
+    d = constants[i, 3]
+    ct = math.cos(theta[i])
+    st = math.sin(theta[i])
+
+    tf = dh_transforms[i]
+    tf[0, 0] = ct
+    tf[0, 1] = -st * ca
+    tf[0, 2] = st * sa
+    tf[0, 3] = a * ct
+    tf[1, 0] = st
+    tf[1, 1] = ct * ca
+    tf[1, 2] = -ct * sa
+    tf[1, 3] = a * st
+    tf[2, 0] = 0.0
+    tf[2, 1] = sa
+    tf[2, 2] = ca
+    tf[2, 3] = d
+    tf[3, 0] = 0.0
+    tf[3, 1] = 0.0
+    tf[3, 2] = 0.0
+    tf[3, 3] = 1.0
+
+    general.mul4(cumulative[i], tf, cumulative[i + 1])
+
+
+def fill_dh_transforms(xp, dh_params, theta, transforms) -> None:
+  """Write the DH transforms of many configurations into a buffer
+
+  Shared by fk_batch and fk_batch_torch, xp is the array module the inputs 
+  come from (numpy or torch) and provides cos and sin. 
+
+  Args:
+      xp (module): numpy or torch
+      dh_params (array): (6,4) rows of alpha, a, d, theta_offset
+      theta (array): (n,6) theta of each joint, offsets included
+      transforms (array): (n,6,4,4) zeroed output buffer
+  """
+  ct = xp.cos(theta)
+  st = xp.sin(theta)
+  ca = xp.cos(dh_params[:, 0])
+  sa = xp.sin(dh_params[:, 0])
+  a = dh_params[:, 1]
+  d = dh_params[:, 2]
+
+  transforms[..., 0, 0] = ct
+  transforms[..., 0, 1] = -st * ca
+  transforms[..., 0, 2] = st * sa
+  transforms[..., 0, 3] = a * ct
+  transforms[..., 1, 0] = st
+  transforms[..., 1, 1] = ct * ca
+  transforms[..., 1, 2] = -ct * sa
+  transforms[..., 1, 3] = a * st
+  transforms[..., 2, 1] = sa
+  transforms[..., 2, 2] = ca
+  transforms[..., 2, 3] = d
+  transforms[..., 3, 3] = 1.0
+
+
+def fold_transforms(transforms):
+  """Chain the (n,6,4,4) DH transforms into (n,4,4) end effector frames"""
+  ee_frames = transforms[:, 0]
+  for index in range(1, transforms.shape[1]):
+    ee_frames = ee_frames @ transforms[:, index]
+  return ee_frames
+
+
+def fk_batch(dh_params: np.ndarray, joint_angles: np.ndarray) -> np.ndarray:
+  """Forward kinematics of many configurations at once
+
+  Args:
+      dh_params (np.ndarray): (6,4) rows of alpha, a, d, theta_offset
+      joint_angles (np.ndarray): (n,6) joint angles of each configuration
+
+  Returns:
+      np.ndarray: (n,4,4) end effector frames in frame 0
+  """
+  theta = joint_angles + dh_params[:, 3]
+  transforms = np.zeros(theta.shape + (4, 4))
+  fill_dh_transforms(np, dh_params, theta, transforms)
+  return fold_transforms(transforms)
+
+
+def fk_batch_torch(dh_params: np.ndarray,
+                   joint_angles: np.ndarray,
+                   batch_size: int = 1024) -> np.ndarray:
+  """Forward kinematics of many configurations at once with torch
+
+  Same result as fk_batch, but the DH transforms are built and folded as 
+  tensors on the GPU when one is available. Configurations are sent in 
+  batches of batch_size to amortize the launch overhead, and only the end 
+  effector frames are copied back. 
+
+  Args:
+      dh_params (np.ndarray): (6,4) rows of alpha, a, d, theta_offset
+      joint_angles (np.ndarray): (n,6) joint angles of each configuration
+      batch_size (int, optional): configurations per batch. Defaults to 1024.
+
+  Returns:
+      np.ndarray: (n,4,4) end effector frames in frame 0
+  """
+  import torch
+
+  device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+  params = torch.as_tensor(dh_params, dtype=torch.float64, device=device)
+
+  ee_frames = np.empty((joint_angles.shape[0], 4, 4))
+  for start in range(0, joint_angles.shape[0], batch_size):
+    theta = torch.as_tensor(joint_angles[start:start + batch_size],
+                            dtype=torch.float64,
+                            device=device) + params[:, 3]
+    transforms = torch.zeros(theta.shape + (4, 4),
+                             dtype=torch.float64,
+                             device=device)
+    fill_dh_transforms(torch, params, theta, transforms)
+    frames = fold_transforms(transforms)
+    ee_frames[start:start + batch_size] = frames.cpu().numpy()
+  return ee_frames
+
+
+def pose_error(target: np.ndarray, current: np.ndarray) -> np.ndarray:
+  """Error twist taking the current frame to the target frame
+
+  Args:
+      target (np.ndarray): (4,4) desired frame
+      current (np.ndarray): (4,4) current frame
+
+  Returns:
+      np.ndarray: (6,) position error in mm followed by orientation error
+  """
+  orientation = 0.5 * (np.cross(current[:3, 0], target[:3, 0]) +
+                       np.cross(current[:3, 1], target[:3, 1]) +
+                       np.cross(current[:3, 2], target[:3, 2]))
+  return np.concatenate((target[:3, 3] - current[:3, 3], orientation))
 
 
 def make_frame(rotation: np.ndarray, translation: np.ndarray) -> np.ndarray:
   """Create a tool transform using rotation and translation via ZYX Euler Trans.
 
+  The rotation is Rz * Ry * Rx written out in closed form. 
+
   Args:
       rotation (np.ndarray): numpy 3x1 array of rotations
       translate (np.ndarray): numpy 3x1 array of translations
@@ -37,13 +218,23 @@ def make_frame(rotation: np.ndarray, translation: np.ndarray) -> np.ndarray:
   Returns:
       np.ndarray: 4x4 numpy transformation array
   """
-  rot_mat = kdl.Rotation()
-  rot_mat.DoRotZ(rotation[2])
-  rot_mat.DoRotY(rotation[1])
-  rot_mat.DoRotX(rotation[0])
-  frame = kdl.Frame(rot_mat, kdl.Vector(*translation))
+  cx = math.cos(rotation[0])
+  sx = math.sin(rotation[0])
+  cy = math.cos(rotation[1])
+  sy = math.sin(rotation[1])
+  cz = math.cos(rotation[2])
+  sz = math.sin(rotation[2])
 
-  return general.kdl_frame_to_np(frame)
+  r_01 = cz * sy * sx - sz * cx
+  r_02 = cz * sy * cx + sz * sx
+  r_11 = sz * sy * sx + cz * cx
+  r_12 = sz * sy * cx - cz * sx
+
+  return np.array(
+      [[cz * cy, r_01, r_02, translation[0]],
+       [sz * cy, r_11, r_12, translation[1]],
+       [-sy, cy * sx, cy * cx, translation[2]], [0.0, 0.0, 0.0, 1.0]],
+      dtype=general.FLOAT_TYPE)
 
 
 class Workspace(object):
@@ -69,6 +260,15 @@ class Workspace(object):
 
 class Fanuc(object):
   """Fanuc class to hold the information about the Fanuc Arm """
+  IK_SEED_COUNT = 10000  # sampled configurations used to seed numerical IK
+  IK_SEED_NEIGHBORS = 8  # nearest seeds considered per numerical solve
+  IK_MAX_ITERATIONS = 100  # Gauss-Newton iterations per seed
+  IK_TOLERANCE = 1e-5  # position (mm) and rotation errors that count as solved
+  IK_DAMPING = 1e-2  # damping of the least squares step near singularities
+  SHOULDER_SINGULAR_RADIUS = 1e-2  # mm off the joint 1 axis taken as on it
+  WRIST_SINGULAR_SIN = 1e-5  # sin(theta_5) taken as zero, above float32 noise
+  MAX_JOINT_STEP = 0.1  # largest joint change (rad) between drawn path frames
+
   @property
   def joints(self) -> List[Joint]:
     return [
@@ -80,28 +280,70 @@ class Fanuc(object):
   def ee_frame(self) -> np.ndarray:
     """Returns the position of the end effector given the joint transforms 
 
-    Note, this is an inefficient call as it recalculates each time. If you want to 
-    be fancy and make your code run faster, you can re-write this. 
+    The cumulative transforms are cached and only recomputed after a joint's 
+    DH transform changes. The returned array is reused by the next 
+    recompute, keep a general.clone_transform of it if you need it later. 
 
     Returns:
         np.ndarray: (4,4) of the final location of the end effector. 
     """
-    ee_frame = self._joint_1.dh_transform @ self._joint_2.dh_transform @ self._joint_3.dh_transform @ self._joint_4.dh_transform @ self._joint_5.dh_transform @ self._joint_6.dh_transform
-    return ee_frame
+    self._recompute_cumulative()
+    return self._cumulative[6]
+
+  def __init__(self, backend: str = 'numpy'):
+    """Initialize the class 
 
-  def __init__(self):
-    """Initialize the class """
+    Only the kinematics are set up here. The figure and every artist are 
+    created by _init_drawing on the first draw_fanuc call, so FK/IK only 
+    use never builds a matplotlib figure. 
+
+    Args:
+        backend (str, optional): 'numpy' or 'torch', used by forward_batch. 
+            Defaults to 'numpy'.
+    """
+    if backend not in ('numpy', 'torch'):
+      raise ValueError(f"Unknown FK backend '{backend}'")
+    if backend == 'torch' and importlib.util.find_spec('torch') is None:
+      raise ImportError("The torch FK backend needs torch installed")
+    self.backend = backend
 
     self._joints = []
     self._drawn_once = False
+    self._background = None
+    self.fig = None
+    self.ax = None
+    self._links = []
+
+    self._init_kinematics()
+
+  def _init_kinematics(self):
+    """Set up the robot geometry, joints and brush"""
+
+    # Transforms of the base frame (slot 0) and joints 1-6, owned here and
+    # viewed by each Joint so the chain is walked over contiguous memory
+    self._dh = np.tile(np.eye(4, dtype=general.FLOAT_TYPE), (7, 1, 1))
+    self._final = np.tile(np.eye(4, dtype=general.FLOAT_TYPE), (7, 1, 1))
+
+    # Cached transforms from frame 0 to frame i, rebuilt when _fk_dirty is set
+    self._cumulative = np.empty((7, 4, 4), dtype=general.FLOAT_TYPE)
+    self._cumulative[0] = np.eye(4)
+    self._fk_dirty = True
 
-    ## TODO -- fill in fanuc physical parameters
     ## Fanuc link lengths in millimeters
-    self.a_1 = ...
-    self.l_1_z = ...
+    self.a_1 = 300  # J1 axis to J2 axis, horizontal
+    self.a_2 = 900  # J2 axis to J3 axis
+    self.a_3 = 180  # J3 axis to J4 axis, vertical
+    self.d_4 = 1600  # J3 to the wrist center along the forearm
+    self.d_6 = 180  # wrist center to the end effector flange
+    self.l_1_z = 1000  # mounting frame to the station frame (frame 0)
+
+    ## Workspace boundaries in the mounting frame the robot is drawn in
+    self.workspace = Workspace(-2739, 2739, -2739, 2739, -721, 3238)
 
-    ## TODO -- create the workspace boundaries. 
-    self.workspace = Workspace(...)
+    ## Constant EE orientation used when drawing paths, tool pointing down.
+    ## Each brush keeps its own rotation w.r.t. it, so switching brushes
+    ## doesn't turn the wrist.
+    self.ee_rotation = np.diag([1.0, -1.0, -1.0])
 
     # Initialzie the colors for drawing links. Feel free to change if you'd like.
     self.colors = [
@@ -114,19 +356,18 @@ class Fanuc(object):
         [1, 0, 1],
     ]
 
-    ## Create the base figure to pass to the joints and links
-    self._create_plot()
-
-    ## Create the brush
-    self.brush = Brush(self.ax)
+    ## Create the brush, its artists come with the axes in _init_drawing
+    self.brush = Brush()
 
     ## Make the base frame
     base_frame = make_frame([0, 0, 0], [0, 0, self.l_1_z])  #self.l_1_z
-    self._base_frame = Joint(self.ax)
+    self._base_frame = Joint(dh_buffer=self._dh,
+                             final_buffer=self._final,
+                             index=0)
     self._base_frame.set_final_transform(base_frame)
     self._base_frame.set_dh_transform(base_frame)
 
-    self._zero_frame = Joint(self.ax)
+    self._zero_frame = Joint()
     self._zero_frame.set_dh_transform(np.eye(4))
     self._zero_frame.set_final_transform(np.eye(4))
 
@@ -138,55 +379,134 @@ class Fanuc(object):
     self._joint_5: Joint = None
     self._joint_6: Joint = None
 
+    # DH table and the FK/IK kernel buffers, filled in by _setup_joints
+    self.dh_params: np.ndarray = None
+    self._fk_constants: np.ndarray = None
+    self._fk_theta: np.ndarray = None
+    self._ik_theta: np.ndarray = None
+    self._ik_dh: np.ndarray = None
+    self._ik_cumulative: np.ndarray = None
+
     self._setup_joints()
 
+    # Built by _build_ik_seeds the first time the numerical IK needs them
+    self._seed_angles = None
+    self._seed_positions = None
+    self._seed_tree = None
+
+  def _init_drawing(self):
+    """Create the figure and hand the axes to everything that draws"""
+    ## Create the base figure to pass to the joints and links
+    self._create_plot()
+
+    self.brush.set_axes(self.ax)
+    self._base_frame.set_axes(self.ax)
+    self._zero_frame.set_axes(self.ax)
+    for joint in self.joints:
+      joint.set_axes(self.ax)
+      joint.draw()
+
     self._links = [Link(self.ax, self.colors[index]) for index in range(6)]
 
   def _setup_joints(self):
-    """Use this area to initialize the joints.
-    TODO 
-    I have provided the start of the first joint. You need to
-    - fill in the limits for the first joint. 
-    - fill in all of the information for the remaining joints. 
+    """Initialize the joints and their limits.
 
-    This will also help you get comfortable with initializing classes. 
+    The joint ranges from the S-500 specification sheet are centered about
+    the zero position. The DH parameters of each joint are held in
+    self.dh_params as (6,4) rows of (alpha, a, d, theta_offset).
     """
+    self.dh_params = np.array([
+        [-math.pi / 2, self.a_1, 0, 0],
+        [0, self.a_2, 0, -math.pi / 2],
+        [-math.pi / 2, self.a_3, 0, 0],
+        [math.pi / 2, 0, self.d_4, 0],
+        [-math.pi / 2, 0, 0, 0],
+        [0, 0, self.d_6, 0],
+    ])
+
+    # Constant terms and theta working buffer handed to the fk_chain kernel
+    self._fk_constants = dh_constants(self.dh_params)
+    self._fk_theta = self.dh_params[:, 3].copy()
+
+    # float64 buffers of the same kernel for the numerical IK iterations
+    self._ik_theta = self.dh_params[:, 3].copy()
+    self._ik_dh = np.tile(np.eye(4), (6, 1, 1))
+    self._ik_cumulative = np.tile(np.eye(4), (7, 1, 1))
+    joint_ranges = [300, 160, 160, 480, 240, 900]
+
+    joints = [
+        Joint(color=self.colors[index],
+              dh_buffer=self._dh,
+              final_buffer=self._final,
+              index=index + 1) for index in range(6)
+    ]
+    (self._joint_1, self._joint_2, self._joint_3, self._joint_4,
+     self._joint_5, self._joint_6) = joints
 
-    self._joint_1 = Joint(self.ax, self.colors[0])
-    self._joint_1.set_joint_limits(math.radians(...), math.radians(...))
-    ...
+    for joint, joint_range in zip(self.joints, joint_ranges):
+      joint.set_joint_limits(math.radians(-joint_range / 2),
+                             math.radians(joint_range / 2))
 
     for joint in self.joints:
-      joint.draw()
+      joint.set_dh_callback(self._mark_fk_dirty)
+
+  def _build_ik_seeds(self):
+    """Sample joint configurations and index their EE positions for seeding"""
+    rng = np.random.default_rng(0)
+    low_limits = [joint.low_limit for joint in self.joints]
+    high_limits = [joint.high_limit for joint in self.joints]
+
+    self._seed_angles = rng.uniform(low_limits, high_limits,
+                                    (self.IK_SEED_COUNT, 6))
+    self._seed_positions = self.forward_batch(self._seed_angles)[:, :3, 3]
+    try:
+      from scipy.spatial import cKDTree
+    except ImportError:
+      return
+    self._seed_tree = cKDTree(self._seed_positions)
+
+  def _mark_fk_dirty(self):
+    """Flag the cached cumulative transforms as stale"""
+    self._fk_dirty = True
+
+  def _recompute_cumulative(self):
+    """Fold the joint DH transforms into the cached cumulative transforms"""
+    if not self._fk_dirty:
+      return
+
+    for index in range(6):
+      general.mul4(self._cumulative[index], self._dh[index + 1],
+                   self._cumulative[index + 1])
+    self._fk_dirty = False
 
   def calculate_fk(self, joint_angles: np.ndarray):
     """Calculate the forward kinematics of the fanuc. 
 
-    TODO 
-
-    In this function, you need to load the joint DH parameters into each joint. 
-    This will then allow you to call self.ee_frame to get the final output 
-    frame of the robot, or do any math using joint_X.dh_transform. 
-    Hint: This will use your created dh_tf() 
-    Hint: You should be setting the transform here for all 6 joints. 
+    Loads the DH transform of every joint so self.ee_frame, or any
+    joint_X.dh_transform, reflects the given configuration. The fk_chain 
+    kernel writes straight into the DH buffer the joints view and also fills 
+    the cumulative transform cache. 
 
     Args:
         joint_angles (np.ndarray): (1,6) array of the joint angles 
     """
-
-    self._joint_1.set_dh_transform(...)
-    ...
-
+    np.add(self.dh_params[:, 3], joint_angles, out=self._fk_theta)
+    fk_chain(self._fk_constants, self._fk_theta, self._dh[1:],
+             self._cumulative)
+    self._fk_dirty = False
 
   def calculate_ik(self, ee_frame: np.ndarray,
-                    prev_joint_angles: np.ndarray) -> Tuple[bool, np.ndarray]:
+                   prev_joint_angles: np.ndarray) -> Tuple[bool, np.ndarray]:
     """calculate the inverse kinematics of the fanuc
-    TODO
-    This is the hard part of the whole thing. If you get this working, it's all downhill.
-    Be careful, the devil is in the details. Be sure to include all solution cases. 
-    Be sure to not make large leaps in configuration. 
-    Be sure to test your code well. The auto-grader will certainly test many configurations of 
-    your robot to ensure it can match them. 
+
+    Closed form solution of the spherical wrist: the wrist center gives 
+    joints 1-3 (two shoulder and two elbow branches) and the wrist rotation 
+    R36 = R03^T R gives joints 4-6 as ZYZ Euler angles (two wrist branches). 
+    Every one of the 8 branches is wrapped to the turn closest to the 
+    previous angles, filtered by the joint limits, and the closest one to 
+    prev_joint_angles is returned. With the wrist center on the joint 1 axis 
+    theta_1 is undefined, so the numerical IK is tried from the previous 
+    angles and kept if it lands closer. 
 
     Args:
         ee_frame (np.ndarray): The desired location of the end effector in space as a 4x4 frame
@@ -196,18 +516,277 @@ class Fanuc(object):
         Tuple[bool, np.ndarray]: bool -- whether or not a solutio exists
                                  np.ndarray -- the 6x1 array of that solution if it exists 
     """
+    assert general.check_proper_numpy_format(ee_frame, (4, 4))
+
+    ee_frame = np.asarray(ee_frame, dtype=np.float64)
+    position = ee_frame[:3, 3]
+
+    prev_joint_angles = np.asarray(prev_joint_angles, dtype=float)
+    rotation = ee_frame[:3, :3]
+    wrist_center = position - self.d_6 * rotation[:, 2]
+
+    best_solution = None
+    best_distance = math.inf
+    arm_solutions = self._arm_ik(wrist_center)
+    for arm_angles in arm_solutions:
+      for wrist_angles in self._wrist_ik(arm_angles, rotation,
+                                         prev_joint_angles[3]):
+        solution = self._wrap_to_limits(arm_angles + wrist_angles,
+                                        prev_joint_angles)
+        if solution is None:
+          continue
+
+        distance = np.linalg.norm(solution - prev_joint_angles)
+        if distance < best_distance:
+          best_solution = solution
+          best_distance = distance
+
+    if (math.hypot(wrist_center[0], wrist_center[1]) <
+        self.SHOULDER_SINGULAR_RADIUS):
+      # On the joint 1 axis theta_1 is free and the closed form picks it from
+      # float noise, solve from the previous angles instead
+      found, solution = self._numerical_ik(ee_frame, prev_joint_angles)
+      if found and np.linalg.norm(solution - prev_joint_angles) < best_distance:
+        return True, solution
+
+    if best_solution is None:
+      return False, []
+    return True, best_solution
+
+  def _numerical_ik(self, ee_frame: np.ndarray,
+                    prev_joint_angles: np.ndarray) -> Tuple[bool, np.ndarray]:
+    """Damped Gauss-Newton IK seeded from the sampled configurations
+
+    The previous angles are tried first. Otherwise the nearest seeds by EE 
+    position are ranked by their distance to the previous angles, the 
+    closest seed is tried, and if it does not converge the most distant one 
+    is tried instead. 
+
+    Args:
+        ee_frame (np.ndarray): (4,4) desired end effector frame
+        prev_joint_angles (np.ndarray): (6,) previous joint angles
+
+    Returns:
+        Tuple[bool, np.ndarray]: whether a solution was found and the solution
+    """
+    found, solution = self._gauss_newton(ee_frame, prev_joint_angles)
+    if found:
+      solution = self._wrap_to_limits(solution, prev_joint_angles)
+      if solution is not None:
+        return True, solution
+
+    if self._seed_angles is None:
+      self._build_ik_seeds()
+
+    position = ee_frame[:3, 3]
+    if self._seed_tree is not None:
+      _, indices = self._seed_tree.query(position, k=self.IK_SEED_NEIGHBORS)
+    else:
+      distances = np.sum((self._seed_positions - position)**2, axis=1)
+      indices = np.argpartition(distances, self.IK_SEED_NEIGHBORS)
+      indices = indices[:self.IK_SEED_NEIGHBORS]
+
+    seeds = self._seed_angles[indices]
+    order = np.argsort(np.linalg.norm(seeds - prev_joint_angles, axis=1))
+
+    for seed in (seeds[order[0]], seeds[order[-1]]):
+      found, solution = self._gauss_newton(ee_frame, seed)
+      if found:
+        solution = self._wrap_to_limits(solution, prev_joint_angles)
+        if solution is not None:
+          return True, solution
     return False, []
 
+  def _gauss_newton(self, ee_frame: np.ndarray,
+                    seed: np.ndarray) -> Tuple[bool, np.ndarray]:
+    """Iterate damped least squares steps from a seed
+
+    Args:
+        ee_frame (np.ndarray): (4,4) desired end effector frame
+        seed (np.ndarray): (6,) starting joint angles
+
+    Returns:
+        Tuple[bool, np.ndarray]: whether it converged and the final angles
+    """
+    joint_angles = seed.copy()
+    damping = self.IK_DAMPING**2 * np.eye(6)
+    for _ in range(self.IK_MAX_ITERATIONS):
+      frames = self._forward_frames(joint_angles)
+      error = pose_error(ee_frame, frames[6])
+      if (np.linalg.norm(error[:3]) < self.IK_TOLERANCE
+          and np.linalg.norm(error[3:]) < self.IK_TOLERANCE):
+        return True, joint_angles
+
+      jacobian = self._jacobian(frames)
+      joint_angles = joint_angles + jacobian.T @ np.linalg.solve(
+          jacobian @ jacobian.T + damping, error)
+    return False, joint_angles
+
+  def forward_batch(self, joint_angles: np.ndarray) -> np.ndarray:
+    """EE frames of many configurations on the selected backend
+
+    Args:
+        joint_angles (np.ndarray): (n,6) joint angles of each configuration
+
+    Returns:
+        np.ndarray: (n,4,4) end effector frames in frame 0
+    """
+    if self.backend == 'torch':
+      return fk_batch_torch(self.dh_params, joint_angles)
+    return fk_batch(self.dh_params, joint_angles)
+
+  def _forward_frames(self, joint_angles: np.ndarray) -> np.ndarray:
+    """Frames of a configuration without touching the joints' state
+
+    Runs the fk_chain kernel on float64 buffers kept for IK. The returned 
+    array is reused by the next call.
+
+    Args:
+        joint_angles (np.ndarray): (6,) joint angles
+
+    Returns:
+        np.ndarray: (7,4,4) transforms from frame 0 to frames 0-6
+    """
+    np.add(self.dh_params[:, 3], joint_angles, out=self._ik_theta)
+    fk_chain(self._fk_constants, self._ik_theta, self._ik_dh,
+             self._ik_cumulative)
+    return self._ik_cumulative
+
+  def _jacobian(self, frames: np.ndarray) -> np.ndarray:
+    """Geometric jacobian of the EE pose from the cumulative frames
+
+    Joint i turns about z_(i-1), so its column is z_(i-1) x (p_ee - p_(i-1)) 
+    for the position rows and z_(i-1) for the rotation rows.
+
+    Args:
+        frames (np.ndarray): (7,4,4) frames from _forward_frames
+
+    Returns:
+        np.ndarray: (6,6) jacobian, position rows then rotation rows
+    """
+    axes = frames[:6, :3, 2]
+    origins = frames[:6, :3, 3]
+    jacobian = np.empty((6, 6))
+    jacobian[:3] = np.cross(axes, frames[6, :3, 3] - origins).T
+    jacobian[3:] = axes.T
+    return jacobian
+
+  def _arm_ik(self, wrist_center: np.ndarray) -> List[List[float]]:
+    """Solve joints 1-3 that place the wrist center
+
+    The forearm offset a_3 and length d_4 fold into a single link of length 
+    sqrt(a_3^2 + d_4^2), turning joints 2 and 3 into a planar 2R problem. 
+
+    Args:
+        wrist_center (np.ndarray): (3,) wrist center in frame 0
+
+    Returns:
+        List[List[float]]: up to 4 [theta_1, theta_2, theta_3] solutions
+    """
+    forearm = math.hypot(self.a_3, self.d_4)
+    forearm_angle = math.atan2(self.d_4, self.a_3)
+
+    base_angle = math.atan2(wrist_center[1], wrist_center[0])
+    solutions = []
+    for theta_1 in (base_angle, base_angle + math.pi):
+      # Wrist center in frame 1, x radial and y pointing down
+      planar_x = (math.cos(theta_1) * wrist_center[0] +
+                  math.sin(theta_1) * wrist_center[1] - self.a_1)
+      planar_y = -wrist_center[2]
+
+      cos_elbow = ((planar_x**2 + planar_y**2 - self.a_2**2 - forearm**2) /
+                   (2 * self.a_2 * forearm))
+      if abs(cos_elbow) > 1:
+        continue
+
+      for elbow in (math.acos(cos_elbow), -math.acos(cos_elbow)):
+        shoulder = math.atan2(planar_y, planar_x) - math.atan2(
+            forearm * math.sin(elbow), self.a_2 + forearm * math.cos(elbow))
+        solutions.append([
+            theta_1, shoulder - self.dh_params[1, 3],
+            elbow - forearm_angle
+        ])
+    return solutions
+
+  def _wrist_ik(self, arm_angles: List[float], rotation: np.ndarray,
+                prev_theta_4: float) -> List[List[float]]:
+    """Solve joints 4-6 for the wrist rotation
+
+    R36 = Rz(theta_4) Ry(-theta_5) Rz(theta_6), a ZYZ Euler decomposition. 
+    At the theta_5 = 0 singularity only theta_4 + theta_6 is defined, so 
+    theta_4 is held at its previous value. 
+
+    Args:
+        arm_angles (List[float]): [theta_1, theta_2, theta_3]
+        rotation (np.ndarray): (3,3) desired end effector rotation
+        prev_theta_4 (float): previous joint 4 angle
+
+    Returns:
+        List[List[float]]: up to 2 [theta_4, theta_5, theta_6] solutions
+    """
+    rotation_03 = fk_batch(self.dh_params[:3],
+                           np.array([arm_angles]))[0, :3, :3]
+    rotation_36 = rotation_03.T @ rotation
+
+    sin_5 = math.hypot(rotation_36[0, 2], rotation_36[1, 2])
+    cos_5 = rotation_36[2, 2]
+    if sin_5 < self.WRIST_SINGULAR_SIN and cos_5 > 0:
+      theta_4s = [prev_theta_4]
+    else:
+      theta_4s = [
+          math.atan2(sign * rotation_36[1, 2], sign * rotation_36[0, 2])
+          for sign in (1, -1)
+      ]
+
+    # theta_5 and theta_6 from R46 = Rz(theta_4)^T R36 = Ry(-theta_5)
+    # Rz(theta_6), which stays well conditioned close to theta_5 = 0
+    solutions = []
+    for theta_4 in theta_4s:
+      cos_4 = math.cos(theta_4)
+      sin_4 = math.sin(theta_4)
+      rotation_46_0 = cos_4 * rotation_36[0] + sin_4 * rotation_36[1]
+      rotation_46_1 = cos_4 * rotation_36[1] - sin_4 * rotation_36[0]
+      theta_5 = math.atan2(-rotation_46_0[2], cos_5)
+      theta_6 = math.atan2(rotation_46_1[0], rotation_46_1[1])
+      solutions.append([theta_4, theta_5, theta_6])
+    return solutions
+
+  def _wrap_to_limits(self, joint_angles: List[float],
+                      prev_joint_angles: np.ndarray) -> np.ndarray:
+    """Move each angle by whole turns to land closest to the previous angle
+
+    Args:
+        joint_angles (List[float]): 6 joint angles of a candidate solution
+        prev_joint_angles (np.ndarray): (6,) previous joint angles
+
+    Returns:
+        np.ndarray: (6,) wrapped angles, or None if a joint can't be placed 
+                    inside its limits
+    """
+    wrapped = np.empty(6)
+    for index, (joint, angle, prev_angle) in enumerate(
+        zip(self.joints, joint_angles, prev_joint_angles)):
+      turns = round((prev_angle - angle) / (2 * math.pi))
+      candidates = [
+          angle + 2 * math.pi * (turns + step) for step in (0, -1, 1)
+      ]
+      candidates = [
+          candidate for candidate in candidates
+          if joint.is_inside_joint_limit(candidate)
+      ]
+      if not candidates:
+        return None
+      distances = [abs(candidate - prev_angle) for candidate in candidates]
+      wrapped[index] = candidates[distances.index(min(distances))]
+    return wrapped
+
   def get_ee_pose_from_brush(self, rotation: np.ndarray,
                              brush_pose: np.ndarray) -> np.ndarray:
     """Get the end effector pose from the desired pose of the brush. 
 
-    TODO
-    Note: If you are confused why this blank function is here. Remember that the 
-    test drawing files, and your drawing files, are the location of the Brush tip, NOT the 
-    end effector frame. Therefore, you need to calculate that EE frame from the brush frame 
-    to put into your IK solution. 
-    (If your tetra or prism isn't continuous, it's because this isn't working right)
+    The test drawing files are the location of the Brush tip, NOT the end 
+    effector frame, so the selected brush frame is backed out of the 
+    desired brush pose to get the EE frame to put into the IK solution. 
 
     Args:
         rotation (np.ndarray): (3,3) rotation matrix for the brush
@@ -216,28 +795,136 @@ class Fanuc(object):
     Returns:
         np.ndarray: (4,4) location of the end effector to get the brush at the desired location
     """
-    general.check_proper_numpy_format(rotation, (3, 3))
-    general.check_proper_numpy_format(brush_pose, (3, ))
+    assert general.check_proper_numpy_format(rotation, (3, 3))
+    assert general.check_proper_numpy_format(brush_pose, (3, ))
+
+    brush_frame = np.eye(4)
+    brush_frame[:3, :3] = rotation
+    brush_frame[:3, 3] = brush_pose
+
+    return general.mul4(
+        brush_frame,
+        general.inverse_transform(self.brush.selected_brush_frame_dh),
+        np.empty((4, 4)))
+
+  def get_ee_poses_from_brush(self, rotation: np.ndarray,
+                              brush_poses: np.ndarray,
+                              selections: np.ndarray) -> np.ndarray:
+    """Batched get_ee_pose_from_brush over a whole path. 
+
+    A selection of 0 (no brush) keeps the frame of the last brush used, 
+    starting from the brush's current previous_selection. 
+
+    Args:
+        rotation (np.ndarray): (3,3) rotation matrix for the brush
+        brush_poses (np.ndarray): (n,3) positions in space of the brush
+        selections (np.ndarray): (n,) brush selection at each position
+
+    Returns:
+        np.ndarray: (n,4,4) end effector frames for every position
+    """
+    count = len(brush_poses)
+    brush_index = held_brush_indices(selections,
+                                     self.brush.previous_selection)
 
-    return ...
+    brush_frames = np.tile(np.eye(4), (count, 1, 1))
+    brush_frames[:, :3, :3] = rotation
+    brush_frames[:, :3, 3] = brush_poses
+
+    relative_inverse = general.inverse_transform(self.brush.relative_frames)
+    return brush_frames @ relative_inverse[brush_index]
+
+  def get_ee_poses_at_rotation(self, ee_rotation: np.ndarray,
+                               brush_poses: np.ndarray,
+                               selections: np.ndarray) -> np.ndarray:
+    """EE frames with a fixed orientation that put the brush tips on a path
+
+    Each brush's rotation is ee_rotation times its rotation w.r.t. the end 
+    effector, so only the EE position changes when the brush does. A 
+    selection of 0 holds the last brush, as in get_ee_poses_from_brush. 
+
+    Args:
+        ee_rotation (np.ndarray): (3,3) rotation matrix of the end effector
+        brush_poses (np.ndarray): (n,3) positions in space of the brush
+        selections (np.ndarray): (n,) brush selection at each position
+
+    Returns:
+        np.ndarray: (n,4,4) end effector frames for every position
+    """
+    assert general.check_proper_numpy_format(ee_rotation, (3, 3))
+
+    brush_index = held_brush_indices(selections,
+                                     self.brush.previous_selection)
+    brush_offsets = self.brush.relative_frames[brush_index, :3, 3]
+
+    ee_frames = np.tile(np.eye(4), (len(brush_poses), 1, 1))
+    ee_frames[:, :3, :3] = ee_rotation
+    ee_frames[:, :3, 3] = brush_poses - brush_offsets @ ee_rotation.T
+    return ee_frames
+
+  def plan_fanuc_path(self, starting_angles: np.ndarray,
+                      path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Joint angles of every frame to draw along a path
+
+    Every EE frame along the path is built up front in one batch. The IK is 
+    then solved waypoint by waypoint, warm started from the previous 
+    solution so the robot moves continuously. Waypoints without a solution 
+    are skipped. Steps larger than MAX_JOINT_STEP (e.g. from the starting 
+    angles or a brush change) are split into interpolated frames with no 
+    brush selected, so nothing is painted on the way. 
+
+    Args:
+        starting_angles (np.ndarray): 1x6 starting angles of the robot 
+        path (str): full length path from your home directory to the file 
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (m,6) joint angles of each frame after 
+                                       the start and (m,) brush selections
+    """
+    data = general.get_data_from_yaml(path)
+
+    positions = np.column_stack((data["x"], data["y"], data["z"]))
+    selections = np.asarray(data["color"], dtype=int)
+    ee_frames = self.get_ee_poses_at_rotation(self.ee_rotation, positions,
+                                              selections)
+
+    joint_angles = np.asarray(starting_angles, dtype=float)
+    frames = []
+    frame_selections = []
+    for ee_frame, selection in zip(ee_frames, selections):
+      found, solution = self.calculate_ik(ee_frame, joint_angles)
+      if not found:
+        continue
+
+      steps = math.ceil(
+          np.max(np.abs(solution - joint_angles)) / self.MAX_JOINT_STEP)
+      frames.extend(
+          np.linspace(joint_angles, solution, max(steps, 1) + 1)[1:])
+      frame_selections.extend([0] * (max(steps, 1) - 1) + [int(selection)])
+      joint_angles = solution
+
+    return np.reshape(frames, (-1, 6)), np.asarray(frame_selections, dtype=int)
 
   def draw_fanuc_path(self, starting_angles: np.ndarray, path: str) -> None:
     """Draw the fanuc moving through a desired path
-    TODO -- you must fill this out to draw the fanuc from the start point 
-    to the end point of the path. 
 
     Args:
         starting_angles (np.ndarray): 1x6 starting angles of the robot 
         path (str): full length path from your home directory to the file 
                     eg "/home/lcfarrell/ME_498/lab2/test_paths/prism.yaml"
     """
-    data = general.get_data_from_yaml(path)
+    frames, selections = self.plan_fanuc_path(starting_angles, path)
 
-    
+    self.draw_fanuc(np.asarray(starting_angles, dtype=float))
+    for joint_angles, selection in zip(frames, selections):
+      self.brush.selection = int(selection)
+      self.draw_fanuc(joint_angles)
 
   def _create_plot(self):
     """Initialize the plot to use throughout
         No change necessary, setup function provided"""
+    import matplotlib.pyplot as plt
+
     self.fig = plt.figure(figsize=(8, 8), facecolor='w')
     self.ax = self.fig.add_subplot(111, projection='3d')
     plt.xlim([self.workspace.x_min, self.workspace.x_max])
@@ -248,6 +935,32 @@ class Fanuc(object):
     self.ax.set_zlabel('Z (mm)', fontsize=16)
     # self.ax.view_init(elev=22.8, azim=147.3)
     plt.grid(True)
+    self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+  def _on_draw(self, event) -> None:
+    """Capture the static background after every full render of the figure
+
+    The robot artists are animated, so they are left out of the full render
+    and drawn back on top of the fresh background here. A savefig render can 
+    be at another dpi, so its background is not kept and the next frame does 
+    a full draw instead. 
+    """
+    canvas = self.fig.canvas
+    if canvas.is_saving():
+      self._background = None
+    elif canvas.supports_blit:
+      self._background = canvas.copy_from_bbox(self.fig.bbox)
+    self._draw_robot_artists()
+
+  def _draw_robot_artists(self) -> None:
+    """Draw the frames, links and brush from their current data"""
+    self._base_frame.draw()
+    self._zero_frame.draw()
+    for joint in self.joints:
+      joint.draw()
+    for link in self._links:
+      link.draw()
+    self.brush.redraw()
 
   def initialize_fanuc_drawing(self, joint_angles: np.ndarray) -> None:
     """Initialize the drawing to ensure it draws properly
@@ -256,6 +969,8 @@ class Fanuc(object):
     Args:
         joint_angles (np.ndarray): 6x1 array of joint angles desired. 
     """
+    import matplotlib.pyplot as plt
+
     self.calculate_fk(joint_angles)
     plt.show(block=False)
     plt.pause(0.5)
@@ -268,29 +983,40 @@ class Fanuc(object):
     Args:
         joint_angles (np.ndarray): 6x1 array of the desired joint angles. 
     """
-    general.check_proper_numpy_format(joint_angles, (6, ))
+    assert general.check_proper_numpy_format(joint_angles, (6, ))
+
+    if self.ax is None:
+      self._init_drawing()
 
     self.calculate_fk(joint_angles)
-    if not self._drawn_once:
+    first_draw = not self._drawn_once
+    if first_draw:
       self.initialize_fanuc_drawing(joint_angles)
       self._drawn_once = True
+    elif self._background is not None:
+      self.fig.canvas.restore_region(self._background)
 
     self._base_frame.draw()
     self._zero_frame.draw()
 
-    current_transform = self._base_frame.dh_transform
+    # Move the cached frame 0 transforms into the mounting frame in one call,
+    # straight into the final transforms the joints view
+    self._recompute_cumulative()
+    general.mul4_stack(self._dh[0], self._cumulative, self._final)
 
     for index, joint in enumerate(self.joints):
-      prev_transform = current_transform
-      current_transform = current_transform @ joint.dh_transform
-      joint.set_final_transform(current_transform)
       joint.draw()
-      self._links[index].update_frames(prev_transform, current_transform)
+      self._links[index].update_frames(self._final[index],
+                                       self._final[index + 1])
       self._links[index].draw()
 
     # draw the brush at the end
-    self.brush.update_tool_frame(current_transform)
+    self.brush.update_tool_frame(self._final[6])
     self.brush.show_enabled()
     self.brush.paint()
 
-    plt.pause(0.0001)
\ No newline at end of file
+    if first_draw or self._background is None:
+      # Full render, _on_draw grabs the background and adds the robot on top
+      self.fig.canvas.draw()
+    self.fig.canvas.blit(self.fig.bbox)
+    self.fig.canvas.flush_events()
\ No newline at end of file
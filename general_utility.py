@@ -3,10 +3,115 @@ import math
 import PyKDL as kdl
 import yaml
 
+# Precision of the FK and drawing state, positions in mm and angles in radians
+# fit easily. IK math stays in float64 to reach its residual tolerance.
+FLOAT_TYPE = np.float32
+
+try:
+  from numba import njit
+  HAVE_NUMBA = True
+except ImportError:
+  HAVE_NUMBA = False
+
+  def njit(*args, **kwargs):
+    """Stand-in for numba.njit when numba is not installed
+
+    Supports both the bare @njit and the @njit(...) forms and returns the 
+    function unchanged, so jitted kernels run as plain python. 
+    """
+    if len(args) == 1 and callable(args[0]) and not kwargs:
+      return args[0]
+    return lambda function: function
+
+
+@njit(cache=True, fastmath=True, inline='always')
+def _mul4_unrolled(a: np.ndarray, b: np.ndarray,
+                   out: np.ndarray) -> np.ndarray:
+  """Fully unrolled (4,4) @ (4,4) product, out must not alias a or b"""
+  out[0, 0] = (a[0, 0] * b[0, 0] + a[0, 1] * b[1, 0] + a[0, 2] * b[2, 0] +
+               a[0, 3] * b[3, 0])
+  out[0, 1] = (a[0, 0] * b[0, 1] + a[0, 1] * b[1, 1] + a[0, 2] * b[2, 1] +
+               a[0, 3] * b[3, 1])
+  out[0, 2] = (a[0, 0] * b[0, 2] + a[0, 1] * b[1, 2] + a[0, 2] * b[2, 2] +
+               a[0, 3] * b[3, 2])
+  out[0, 3] = (a[0, 0] * b[0, 3] + a[0, 1] * b[1, 3] + a[0, 2] * b[2, 3] +
+               a[0, 3] * b[3, 3])
+  out[1, 0] = (a[1, 0] * b[0, 0] + a[1, 1] * b[1, 0] + a[1, 2] * b[2, 0] +
+               a[1, 3] * b[3, 0])
+  out[1, 1] = (a[1, 0] * b[0, 1] + a[1, 1] * b[1, 1] + a[1, 2] * b[2, 1] +
+               a[1, 3] * b[3, 1])
+  out[1, 2] = (a[1, 0] * b[0, 2] + a[1, 1] * b[1, 2] + a[1, 2] * b[2, 2] +
+               a[1, 3] * b[3, 2])
+  out[1, 3] = (a[1, 0] * b[0, 3] + a[1, 1] * b[1, 3] + a[1, 2] * b[2, 3] +
+               a[1, 3] * b[3, 3])
+  out[2, 0] = (a[2, 0] * b[0, 0] + a[2, 1] * b[1, 0] + a[2, 2] * b[2, 0] +
+               a[2, 3] * b[3, 0])
+  out[2, 1] = (a[2, 0] * b[0, 1] + a[2, 1] * b[1, 1] + a[2, 2] * b[2, 1] +
+               a[2, 3] * b[3, 1])
+  out[2, 2] = (a[2, 0] * b[0, 2] + a[2, 1] * b[1, 2] + a[2, 2] * b[2, 2] +
+               a[2, 3] * b[3, 2])
+  out[2, 3] = (a[2, 0] * b[0, 3] + a[2, 1] * b[1, 3] + a[2, 2] * b[2, 3] +
+               a[2, 3] * b[3, 3])
+  out[3, 0] = (a[3, 0] * b[0, 0] + a[3, 1] * b[1, 0] + a[3, 2] * b[2, 0] +
+               a[3, 3] * b[3, 0])
+  out[3, 1] = (a[3, 0] * b[0, 1] + a[3, 1] * b[1, 1] + a[3, 2] * b[2, 1] +
+               a[3, 3] * b[3, 1])
+  out[3, 2] = (a[3, 0] * b[0, 2] + a[3, 1] * b[1, 2] + a[3, 2] * b[2, 2] +
+               a[3, 3] * b[3, 2])
+  out[3, 3] = (a[3, 0] * b[0, 3] + a[3, 1] * b[1, 3] + a[3, 2] * b[2, 3] +
+               a[3, 3] * b[3, 3])
+  return out
+
+
+@njit(cache=True, fastmath=True)
+def _mul4_stack_unrolled(a: np.ndarray, stack: np.ndarray,
+                         out: np.ndarray) -> np.ndarray:
+  """Unrolled a @ stack[i] for every (4,4) in the stack"""
+  for index in range(stack.shape[0]):
+    _mul4_unrolled(a, stack[index], out[index])
+  return out
+
+
+if HAVE_NUMBA:
+  mul4 = _mul4_unrolled
+  mul4_stack = _mul4_stack_unrolled
+else:
+  # Unrolled python is slower than BLAS, so fall back to numpy's matmul
+
+  def mul4(a: np.ndarray, b: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Multiply two (4,4) transforms into out, out must not alias a or b
+
+    Args:
+        a (np.ndarray): (4,4) left transform
+        b (np.ndarray): (4,4) right transform
+        out (np.ndarray): (4,4) output buffer
+
+    Returns:
+        np.ndarray: out
+    """
+    return np.matmul(a, b, out=out)
+
+  def mul4_stack(a: np.ndarray, stack: np.ndarray,
+                 out: np.ndarray) -> np.ndarray:
+    """Multiply a (4,4) transform onto every transform of a stack
+
+    Args:
+        a (np.ndarray): (4,4) left transform
+        stack (np.ndarray): (n,4,4) right transforms
+        out (np.ndarray): (n,4,4) output buffer
+
+    Returns:
+        np.ndarray: out
+    """
+    return np.matmul(a, stack, out=out)
+
 
 def check_proper_numpy_format(value: np.ndarray, shape: tuple) -> bool:
   """Send in a numpy array to make sure it is the right shape 
 
+  Call it inside an assert on hot paths so running with python -O (or 
+  PYTHONOPTIMIZE=1) strips the check entirely. 
+
   Args:
       value (np.ndarray): Input value to test
       shape (tuple): desired shape as a tuple ex (4,4)
@@ -23,6 +128,39 @@ def check_proper_numpy_format(value: np.ndarray, shape: tuple) -> bool:
   return True
 
 
+def clone_transform(frame: np.ndarray) -> np.ndarray:
+  """Copy a transform, or a stack of them
+
+  Use this instead of copy.deepcopy, which walks the python object graph 
+  rather than doing a single memory copy of the array. 
+
+  Args:
+      frame (np.ndarray): (4,4) or (n,4,4) transformation matrices
+
+  Returns:
+      np.ndarray: independent copy of the input
+  """
+  return frame.copy()
+
+
+def inverse_transform(frame: np.ndarray) -> np.ndarray:
+  """Invert a homogeneous transform, or a stack of them, in closed form
+
+  Args:
+      frame (np.ndarray): (4,4) or (n,4,4) transformation matrices
+
+  Returns:
+      np.ndarray: inverse transform(s) with the same shape as the input
+  """
+  rotation_t = np.swapaxes(frame[..., :3, :3], -1, -2)
+
+  inverse = np.zeros_like(frame)
+  inverse[..., :3, :3] = rotation_t
+  inverse[..., :3, 3] = -(rotation_t @ frame[..., :3, 3:4])[..., 0]
+  inverse[..., 3, 3] = 1.0
+  return inverse
+
+
 def np_frame_to_kdl(np_frame: np.ndarray) -> kdl.Frame:
   """Turn a numpy 4x4 array into a KDL frame 
   NOTE: It does NOT check that the 4x4 array is a proper transformation
@@ -61,12 +199,9 @@ def kdl_rotation_to_np(rotation: kdl.Rotation) -> np.ndarray:
   if not isinstance(rotation, kdl.Rotation):
     raise TypeError("Must send in a rotation")
 
-  np_matrix = np.eye(3)
-  np_matrix[0:3, 0] = [value for value in rotation.UnitX()]
-  np_matrix[0:3, 1] = [value for value in rotation.UnitY()]
-  np_matrix[0:3, 2] = [value for value in rotation.UnitZ()]
-
-  return np_matrix
+  return np.array([[rotation[0, 0], rotation[0, 1], rotation[0, 2]],
+                   [rotation[1, 0], rotation[1, 1], rotation[1, 2]],
+                   [rotation[2, 0], rotation[2, 1], rotation[2, 2]]])
 
 
 def kdl_frame_to_np(frame: kdl.Frame) -> np.ndarray:
@@ -85,14 +220,14 @@ def kdl_frame_to_np(frame: kdl.Frame) -> np.ndarray:
   if not isinstance(frame, kdl.Frame):
     raise TypeError("Must send in KDL Frame")
 
-  translation_vector = np.array([frame.p.x(), frame.p.y(), frame.p.z()])
-
-  np_matrix = np.eye(4)
-
-  np_matrix[0:3, 0:3] = kdl_rotation_to_np(frame.M)
-  np_matrix[:3, 3] = translation_vector
+  rotation = frame.M
+  translation = frame.p
 
-  return np_matrix
+  return np.array(
+      [[rotation[0, 0], rotation[0, 1], rotation[0, 2], translation[0]],
+       [rotation[1, 0], rotation[1, 1], rotation[1, 2], translation[1]],
+       [rotation[2, 0], rotation[2, 1], rotation[2, 2], translation[2]],
+       [0.0, 0.0, 0.0, 1.0]])
 
 
 def get_data_from_yaml(filepath: str) -> dict:
@@ -1,11 +1,86 @@
 import numpy as np
 import math
-import PyKDL as kdl
-from mpl_toolkits.mplot3d import Axes3D
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
 import general_utility as general
 from drawing_helper import FrameDrawing, LinkDrawing
 
+if TYPE_CHECKING:
+  from mpl_toolkits.mplot3d import Axes3D
+
+# Rotation about Z of each brush w.r.t. the end effector, in selection order
+BRUSH_YAWS = (5 * math.pi / 4, 7 * math.pi / 4, math.pi / 4, 3 * math.pi / 4)
+BRUSH_PITCH = -math.pi / 4
+
+
+def make_tool_frame(yaw: float, pitch: float, x_offset: float,
+                    z_offset: float) -> np.ndarray:
+  """Closed form of Rz(yaw) * Tx(x_offset) * Ry(pitch) * Tz(z_offset)
+
+  Args:
+      yaw (float): rotation about Z in radians
+      pitch (float): rotation about the new Y in radians
+      x_offset (float): translation along X after the yaw in mm
+      z_offset (float): translation along Z after the pitch in mm
+
+  Returns:
+      np.ndarray: (4,4) array of the final transformation
+  """
+  cy = math.cos(yaw)
+  sy = math.sin(yaw)
+  cp = math.cos(pitch)
+  sp = math.sin(pitch)
+
+  return np.array([[cy * cp, -sy, cy * sp, cy * (x_offset + z_offset * sp)],
+                   [sy * cp, cy, sy * sp, sy * (x_offset + z_offset * sp)],
+                   [-sp, 0.0, cp, z_offset * cp],
+                   [0.0, 0.0, 0.0, 1.0]],
+                  dtype=general.FLOAT_TYPE)
+
+
+@lru_cache(maxsize=None)
+def _brush_relative_frames(tool_radius: float,
+                           tool_length: float) -> np.ndarray:
+  """Build the constant brush frames w.r.t. the end effector once per size
+
+  Args:
+      tool_radius (float): radial offset of the brushes in mm
+      tool_length (float): length of the tool along the end effector Z in mm
+
+  Returns:
+      np.ndarray: read only (4,4,4) stack of the brush frames
+  """
+  frames = np.array([
+      make_tool_frame(yaw, BRUSH_PITCH, -tool_radius, tool_length)
+      for yaw in BRUSH_YAWS
+  ])
+  frames.setflags(write=False)
+  return frames
+
+
+def held_brush_indices(selections: np.ndarray,
+                       previous_selection: int = 1) -> np.ndarray:
+  """Index of the brush frame to use for every selection of a sequence
+
+  A selection of 0 (no brush) holds the last brush selected before it, or 
+  previous_selection if no brush has been selected yet in the sequence. 
+
+  Args:
+      selections (np.ndarray): (n,) brush selections, 0 for no brush
+      previous_selection (int, optional): brush held before the sequence.
+          Defaults to 1.
+
+  Returns:
+      np.ndarray: (n,) indices into the brush frames (selection - 1)
+  """
+  selections = np.asarray(selections, dtype=int)
+  last_selected = np.maximum.accumulate(
+      np.where(selections > 0, np.arange(len(selections)), -1))
+  held = np.where(last_selected >= 0, selections[last_selected],
+                  previous_selection)
+  return held - 1
+
 
 class Brush(object):
   """Class holding the data for a brush object"""
@@ -31,6 +106,8 @@ class Brush(object):
           "Selected a brush color outside of the range [0, {}]".format(
               len(self._colors)))
     self._selection = selection
+    if selection != 0:
+      self._previously_selected_brush_frame = selection
 
   @property
   def color(self):
@@ -44,7 +121,7 @@ class Brush(object):
         np.ndarray: the final frame in space of the brush as a (4,4)
     """
     if self._selection == 0:
-      return np.eye(4)
+      return np.eye(4, dtype=general.FLOAT_TYPE)
     else:
       return self._brush_frames[self._selection - 1]
 
@@ -61,11 +138,27 @@ class Brush(object):
     Returns:
         np.ndarray: The DH parameters of the selected brush as a (4,4)
     """
-    if self._selection == 0:
-      return self._tool_relative_frames[self._previously_selected_brush_frame]
-    else:
-      self._previously_selected_brush_frame = self._selection
-      return self._tool_relative_frames[self._selection - 1]
+    index = held_brush_indices([self._selection],
+                               self._previously_selected_brush_frame)[0]
+    return self._tool_relative_frames[index]
+
+  @property
+  def previous_selection(self):
+    """Return the last nonzero brush selection, the one held at selection 0
+
+    Returns:
+        int: brush selection in [1, 4]
+    """
+    return self._previously_selected_brush_frame
+
+  @property
+  def relative_frames(self):
+    """Return the frames of every brush w.r.t. the end effector
+
+    Returns:
+        np.ndarray: read only (4,4,4) stack, indexed by selection - 1
+    """
+    return self._tool_relative_frames
 
   @property
   def selected_color(self):
@@ -79,75 +172,76 @@ class Brush(object):
     else:
       return self._colors[self._selection - 1]
 
-  def __init__(self, ax: Axes3D):
+  def __init__(self, ax: 'Axes3D' = None):
     """Initialize the brush class 
 
     Args:
-        ax (Axes3D): Axes3D used to draw the brush elements
+        ax (Axes3D, optional): Axes3D used to draw the brush elements. 
+            Defaults to None, see set_axes.
     """
     self._colors = [[0.4940, 0.1840, 0.5560], [0.9290, 0.6940, 0.1250],
                     [0.8500, 0.3250, 0.0980], [0, 0.4470, 0.7410]]
     self._drawn_once = False
     self._selection = 0
-    self._tool_base_frame = np.eye(4)
+    self._tool_base_frame = np.eye(4, dtype=general.FLOAT_TYPE)
 
     ##  Tool dimensions in millimeters
     self.l_t_rad = 50  #[mm]
     self.l_t = 300  #[mm]
     self._previously_selected_brush_frame = 1
 
-    self._ax = ax
+    self._ax = None
 
-    self._tool_relative_frames = []
+    self._tool_relative_frames = None
     self._create_tool_relative_frames()
-    self._brush_frames = [np.eye(4) for _ in range(4)]
+    self._brush_frames = np.tile(np.eye(4, dtype=general.FLOAT_TYPE),
+                                 (4, 1, 1))
 
-    self._tool_lines = [LinkDrawing(self._ax, color) for color in self._colors]
+    self._tool_lines = []
+    self._paint_points = [[[], [], []] for _ in self._colors]
+    self._paint_artists = []
+    if ax is not None:
+      self.set_axes(ax)
 
-  def _create_tool_relative_frames(self):
-    """Create the relative tool frames"""
-    self._tool_relative_frames.append(
-        self._make_tool_frame([0, -math.pi / 4, 5 * math.pi / 4],
-                              [-self.l_t_rad, 0, self.l_t]))
-    self._tool_relative_frames.append(
-        self._make_tool_frame([0, -math.pi / 4, 7 * math.pi / 4],
-                              [-self.l_t_rad, 0, self.l_t]))
-    self._tool_relative_frames.append(
-        self._make_tool_frame([0, -math.pi / 4, math.pi / 4],
-                              [-self.l_t_rad, 0, self.l_t]))
-    self._tool_relative_frames.append(
-        self._make_tool_frame([0, -math.pi / 4, 3 * math.pi / 4],
-                              [-self.l_t_rad, 0, self.l_t]))
-
-  def _make_tool_frame(self, rotation: np.ndarray,
-                       translation: np.ndarray) -> np.ndarray:
-    """Make a tool frame to show up how we want in space w.r.t the EE 
+  def set_axes(self, ax: 'Axes3D'):
+    """Create the brush artists on the axes, needed before any drawing
 
     Args:
-        rotation (np.ndarray): Rotation of the tool as rotations around X, Y, Z 
-        translation (np.ndarray): Translation of the tool in X, Y, Z
-
-    Returns:
-        np.ndarray: (4,4) array of the final transformation
+        ax (Axes3D): Axes3D used to draw the brush elements
     """
-    tool_frame = kdl.Frame()
-    tool_frame.M.DoRotZ(rotation[2])
-    tool_frame = tool_frame * kdl.Frame(kdl.Vector(translation[0], 0, 0))
-    tool_frame.M.DoRotY(rotation[1])
-    tool_frame = tool_frame * kdl.Frame(kdl.Vector(0, 0, translation[2]))
+    self._ax = ax
+    self._tool_lines = [LinkDrawing(self._ax, color) for color in self._colors]
 
-    return general.kdl_frame_to_np(tool_frame)
+    # One animated artist per color collects that color's paint spots
+    self._paint_artists = [
+        self._ax.plot(*points,
+                      ".",
+                      color=color,
+                      markersize=10,
+                      animated=True)[0]
+        for points, color in zip(self._paint_points, self._colors)
+    ]
+
+  def _create_tool_relative_frames(self):
+    """Create the relative tool frames, shared between brushes of a size"""
+    self._tool_relative_frames = _brush_relative_frames(self.l_t_rad, self.l_t)
 
   def update_tool_frame(self, frame: np.ndarray):
     """Update the base frame for the tool (the robot end effector frame)
 
+    The brush frames are moved here, once per frame. The tool lines follow 
+    the next time the brush is drawn.
+
     Args:
         frame (np.ndarray): (4,4) Transformation matrix to the robot end effector
     """
-    general.check_proper_numpy_format(frame, (4, 4))
+    assert general.check_proper_numpy_format(frame, (4, 4))
 
     self._tool_base_frame = frame
-    self._update_tool_frames()
+
+    # Move all of the relative frames into space in one call
+    general.mul4_stack(self._tool_base_frame, self._tool_relative_frames,
+                       self._brush_frames)
 
   def _update_tool_frames(self, enable_all: bool = False):
     """Internal update of all of the tool frames to draw the correct ones
@@ -155,21 +249,13 @@ class Brush(object):
     Args:
         enable_all (bool, optional): True if you want to draw all brushes at once. Defaults to False.
     """
-
-    for index, frame in enumerate(self._tool_relative_frames):
-      new_frame = self._tool_base_frame @ frame
-
-      self._brush_frames[index] = new_frame
-      if enable_all:
-        self._tool_lines[index].update_frames(self._tool_base_frame,
-                                              self._brush_frames[index])
-      elif not enable_all and np.allclose(self.selected_brush_frame,
-                                          self._brush_frames[index]):
-        self._tool_lines[index].update_frames(self._tool_base_frame,
-                                              self._brush_frames[index])
+    selected_index = self._selection - 1
+    for index, tool_line in enumerate(self._tool_lines):
+      if enable_all or index == selected_index:
+        tool_line.update_frames(self._tool_base_frame,
+                                self._brush_frames[index])
       else:
-        self._tool_lines[index].update_frames(self._tool_base_frame,
-                                              self._tool_base_frame)
+        tool_line.update_frames(self._tool_base_frame, self._tool_base_frame)
 
   def _draw(self, enable_all: bool = False):
     """Internal method to handle the different ways of drawing depending on enabled brushes
@@ -200,17 +286,29 @@ class Brush(object):
     self._draw(enable_all=True)
 
     if self._selection != 0:
-      self._ax.plot([self.selected_brush_frame[0, 3]],
-                    [self.selected_brush_frame[1, 3]],
-                    [self.selected_brush_frame[2, 3]],
-                    ".b",
-                    color=self.selected_color,
-                    markersize=10)
+      points = self._paint_points[self._selection - 1]
+      for axis in range(3):
+        points[axis].append(self.selected_brush_frame[axis, 3])
+      self._paint_artists[self._selection - 1].set_data_3d(*points)
+
+    self._draw_paint()
+
+  def _draw_paint(self):
+    """Draw every paint spot left behind so far"""
+    for artist in self._paint_artists:
+      self._ax.draw_artist(artist)
+
+  def redraw(self):
+    """Redraw the brushes and paint spots without updating them"""
+    if self._drawn_once:
+      for tool_line in self._tool_lines:
+        tool_line.redraw()
+    self._draw_paint()
 
 
 class Link(object):
   """Class to hold information about and for a link"""
-  def __init__(self, ax: Axes3D, color=None):
+  def __init__(self, ax: 'Axes3D', color=None):
     """Create a Link 
     Links contain LinkDrawings and act a pass through and information holders
 
@@ -218,8 +316,8 @@ class Link(object):
         ax (Axes3D): Axes3D to use to draw
         color (_type_, optional): Color to draw if rgb frame is not desired. Defaults to None.
     """
-    self._frame_1 = np.eye(4)
-    self._frame_2 = np.eye(4)
+    self._frame_1 = np.eye(4, dtype=general.FLOAT_TYPE)
+    self._frame_2 = np.eye(4, dtype=general.FLOAT_TYPE)
     self._link_drawings = LinkDrawing(ax, color)
     self._drawn_once = False
 
@@ -230,8 +328,8 @@ class Link(object):
         frame_1 (np.ndarray): (4,4) Transformation matrix to the start point
         frame_2 (np.ndarray): (4,4) Transformation matrix to the end point. 
     """
-    general.check_proper_numpy_format(frame_1, (4, 4))
-    general.check_proper_numpy_format(frame_2, (4, 4))
+    assert general.check_proper_numpy_format(frame_1, (4, 4))
+    assert general.check_proper_numpy_format(frame_2, (4, 4))
 
     self._link_drawings.update_frames(frame_1, frame_2)
 
@@ -282,19 +380,49 @@ class Joint(object):
     """
     return self._final_transform
 
-  def __init__(self, ax: Axes3D, color=None):
+  def __init__(self,
+               ax: 'Axes3D' = None,
+               color=None,
+               dh_buffer: np.ndarray = None,
+               final_buffer: np.ndarray = None,
+               index: int = 0):
     """Initialize the joint
 
+    The transforms live in slot index of the (n,4,4) buffers, so a robot can 
+    keep the transforms of all of its joints contiguous. 
+
     Args:
-        ax (Axes3D): Axes3D used to draw the joint
+        ax (Axes3D, optional): Axes3D used to draw the joint. 
+            Defaults to None, see set_axes.
         color (array, optional): Color if black isn't desired. Defaults to None.
+        dh_buffer (np.ndarray, optional): (n,4,4) DH transform storage. 
+            Defaults to a private buffer.
+        final_buffer (np.ndarray, optional): (n,4,4) final transform storage. 
+            Defaults to a private buffer.
+        index (int, optional): slot of this joint in the buffers. Defaults to 0.
     """
+    if dh_buffer is None:
+      dh_buffer = np.eye(4, dtype=general.FLOAT_TYPE)[np.newaxis].copy()
+    if final_buffer is None:
+      final_buffer = np.eye(4, dtype=general.FLOAT_TYPE)[np.newaxis].copy()
+
     self._joint_limit = [0, 0]
     self._drawn_once = False
-    self._dh_transform = np.eye(4)
-    self._final_transform = np.eye(4)
+    self._dh_transform = dh_buffer[index]
+    self._final_transform = final_buffer[index]
     self._color = color
-    self._frame_drawing = FrameDrawing(ax, color)
+    self._frame_drawing = None
+    self._dh_callback = None
+    if ax is not None:
+      self.set_axes(ax)
+
+  def set_axes(self, ax: 'Axes3D'):
+    """Attach the joint to the axes it draws on, needed before draw()
+
+    Args:
+        ax (Axes3D): Axes3D used to draw the joint
+    """
+    self._frame_drawing = FrameDrawing(ax, self._color)
 
   def set_joint_limits(self, low_limit: float, high_limit: float):
     """Set the low and high joint limits
@@ -305,14 +433,24 @@ class Joint(object):
     """
     self._joint_limit = [low_limit, high_limit]
 
+  def set_dh_callback(self, callback):
+    """Set a function to call whenever the DH transform changes
+
+    Args:
+        callback (callable): function taking no arguments, or None to clear
+    """
+    self._dh_callback = callback
+
   def set_dh_transform(self, transform: np.ndarray):
     """Set the DH transform of the joint
 
     Args:
         transform (np.ndarray): (4,4) array of the complete transform
     """
-    general.check_proper_numpy_format(transform, (4, 4))
-    self._dh_transform = transform
+    assert general.check_proper_numpy_format(transform, (4, 4))
+    self._dh_transform[...] = transform
+    if self._dh_callback is not None:
+      self._dh_callback()
     self._update_drawing()
 
   def set_final_transform(self, transform: np.ndarray):
@@ -321,11 +459,13 @@ class Joint(object):
     Args:
         transform (np.ndarray): (4,4) transform for location to draw in space
     """
-    general.check_proper_numpy_format(transform, (4, 4))
-    self._final_transform = transform
+    assert general.check_proper_numpy_format(transform, (4, 4))
+    self._final_transform[...] = transform
 
   def _update_drawing(self):
     """Update the artist with most recent data"""
+    if self._frame_drawing is None:
+      return
     self._frame_drawing.update_frame(self._final_transform)
 
   def draw(self):
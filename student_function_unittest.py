@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+import unittest
+import importlib.util
+import math
+import os
+import numpy as np
+
+from fanuc import Fanuc, fk_batch, fk_batch_torch
+
+
+class TestFanucIK(unittest.TestCase):
+  def setUp(self):
+    self.robot = Fanuc()
+
+  def test_ik_round_trip(self):
+    """FK then IK warm started nearby gives back the pose and the angles"""
+    rng = np.random.default_rng(0)
+    low_limits = [joint.low_limit for joint in self.robot.joints]
+    high_limits = [joint.high_limit for joint in self.robot.joints]
+
+    for joint_angles in rng.uniform(low_limits, high_limits, (3000, 6)):
+      self.robot.calculate_fk(joint_angles)
+      ee_frame = self.robot.ee_frame.copy()
+      prev_joint_angles = joint_angles + rng.normal(0, 0.05, 6)
+
+      found, solution = self.robot.calculate_ik(ee_frame, prev_joint_angles)
+      self.assertTrue(found)
+      if abs(joint_angles[4]) > 1e-3:
+        # Away from the wrist singularity the angles are unique
+        np.testing.assert_allclose(solution, joint_angles, atol=1e-2)
+
+      self.robot.calculate_fk(solution)
+      np.testing.assert_allclose(self.robot.ee_frame[:3, :3],
+                                 ee_frame[:3, :3],
+                                 atol=1e-4)
+      np.testing.assert_allclose(self.robot.ee_frame[:3, 3],
+                                 ee_frame[:3, 3],
+                                 atol=1e-1)
+
+  def test_ik_singular_wrist(self):
+    """theta_5 = 0 from a float32 FK frame keeps theta_4 where it was"""
+    joint_angles = np.array([0.2, 0.1, -0.2, 1.0, 0.0, 0.3])
+    self.robot.calculate_fk(joint_angles)
+
+    found, solution = self.robot.calculate_ik(self.robot.ee_frame,
+                                              joint_angles)
+    self.assertTrue(found)
+    np.testing.assert_allclose(solution, joint_angles, atol=1e-3)
+
+  def test_ik_shoulder_singularity(self):
+    """theta_1 stays put with the wrist center on the joint 1 axis"""
+    joint_angles = np.array([0.2, -1.033, -0.128, 0.5, 0.8, 0.3])
+    wrist_center = np.array([0.0, 0.0, 2000.0])
+    for arm_angles in self.robot._arm_ik(wrist_center):
+      if all(
+          joint.is_inside_joint_limit(angle)
+          for joint, angle in zip(self.robot.joints[1:3], arm_angles[1:])):
+        joint_angles[1:3] = arm_angles[1:]
+    self.robot.calculate_fk(joint_angles)
+
+    found, solution = self.robot.calculate_ik(self.robot.ee_frame,
+                                              joint_angles)
+    self.assertTrue(found)
+    np.testing.assert_allclose(solution, joint_angles, atol=1e-3)
+
+  def test_brush_poses_batched_matches_single(self):
+    """Selection 0 holds the previous brush in both versions"""
+    rotation = np.diag([1.0, -1.0, -1.0])
+    position = np.array([100.0, 200.0, 300.0])
+    selections = [0, 3, 0, 4, 0]
+
+    single = []
+    for selection in selections:
+      self.robot.brush.selection = selection
+      single.append(self.robot.get_ee_pose_from_brush(rotation, position))
+
+    batched = Fanuc().get_ee_poses_from_brush(
+        rotation, np.tile(position, (len(selections), 1)), selections)
+    np.testing.assert_allclose(np.array(single), batched, atol=1e-3)
+
+  def test_path_has_no_large_jumps(self):
+    """Consecutive frames of tetra.yaml move each joint by a bounded step"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "tetra.yaml")
+    starting_angles = np.zeros(6)
+    frames, selections = self.robot.plan_fanuc_path(starting_angles, path)
+
+    self.assertEqual(len(frames), len(selections))
+    steps = np.abs(np.diff(np.vstack((starting_angles, frames)), axis=0))
+    self.assertLessEqual(steps.max(), Fanuc.MAX_JOINT_STEP + 1e-9)
+
+
+class TestFanucFK(unittest.TestCase):
+  @unittest.skipIf(importlib.util.find_spec('torch') is None,
+                   "torch is not installed")
+  def test_fk_batch_torch_matches_numpy(self):
+    """The torch backend gives the same frames as fk_batch"""
+    robot = Fanuc()
+    joint_angles = np.random.default_rng(0).uniform(-math.pi, math.pi,
+                                                    (3000, 6))
+
+    np.testing.assert_allclose(fk_batch_torch(robot.dh_params, joint_angles),
+                               fk_batch(robot.dh_params, joint_angles),
+                               atol=1e-9)
+
+
+if __name__ == "__main__":
+  unittest.main()